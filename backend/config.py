@@ -1,15 +1,64 @@
-from dotenv import load_dotenv
 import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+_ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Immutable snapshot of the app configuration, read from the environment once."""
+
+    spotify_client_id: str
+    spotify_client_secret: str
+    spotify_redirect_uri: str
+    frontend_url: str
+    spotify_cache_path: str
+    openai_api_key: str
+    database_url: str
+    # Connection pool sizing for server databases (ignored for SQLite)
+    db_pool_size: int
+    db_max_overflow: int
+    db_pool_timeout: int
+    db_pool_recycle: int
+    db_pool_use_lifo: bool
+    intent_cache_enabled: bool
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load .env and build the Settings object; subsequent calls return the cached instance."""
+    load_dotenv(dotenv_path=os.path.join(_ROOT_DIR, ".env"), override=True)
+    return Settings(
+        spotify_client_id=os.getenv("SPOTIFY_CLIENT_ID", ""),
+        spotify_client_secret=os.getenv("SPOTIFY_CLIENT_SECRET", ""),
+        spotify_redirect_uri=os.getenv("SPOTIFY_REDIRECT_URI", "http://localhost:8000/callback"),
+        frontend_url=os.getenv("FRONTEND_URL", "http://localhost:5173"),
+        spotify_cache_path=os.getenv("SPOTIFY_CACHE_PATH", os.path.join(_ROOT_DIR, ".spotify_cache")),
+        openai_api_key=os.getenv("OPENAI_API_KEY", ""),
+        database_url=os.getenv("DATABASE_URL", "sqlite:///./music.db"),
+        db_pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        db_pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        db_pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "3600")),
+        db_pool_use_lifo=_env_flag("DB_POOL_USE_LIFO", "1"),
+        intent_cache_enabled=_env_flag("INTENT_CACHE_ENABLED", "1"),
+    )
+
+
+settings = get_settings()
 
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"), override=True)
-
-SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", "")
-SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET", "")
-SPOTIFY_REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "http://localhost:8000/callback")
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
-SPOTIFY_CACHE_PATH = os.getenv(
-    "SPOTIFY_CACHE_PATH",
-    os.path.join(os.path.dirname(__file__), "..", ".spotify_cache"),
-)
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./music.db")
+# Module-level constants kept for existing importers (e.g. voice_client.py)
+SPOTIFY_CLIENT_ID = settings.spotify_client_id
+SPOTIFY_CLIENT_SECRET = settings.spotify_client_secret
+SPOTIFY_REDIRECT_URI = settings.spotify_redirect_uri
+FRONTEND_URL = settings.frontend_url
+SPOTIFY_CACHE_PATH = settings.spotify_cache_path
+OPENAI_API_KEY = settings.openai_api_key
+DATABASE_URL = settings.database_url
@@ -1,20 +1,60 @@
 import logging
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import Connection, create_engine, delete, event, func, inspect, select
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from backend.config import DATABASE_URL
+from backend.config import get_settings
 
 logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # required for SQLite
-    echo=False,
+
+def _engine_options(url: str) -> dict[str, Any]:
+    """Pool settings for the configured database dialect."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options: dict[str, Any] = {"connect_args": {"check_same_thread": False}}  # required for SQLite
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory SQLite lives inside one connection; share it across threads.
+            options["poolclass"] = StaticPool
+        return options
+    settings = get_settings()
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+    }
+
+
+_database_url = get_settings().database_url
+engine = create_engine(_database_url, echo=False, **_engine_options(_database_url))
+
+# WAL lets readers proceed during writes; synchronous=NORMAL is durable under WAL
+# and avoids an fsync per commit.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, _connection_record) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_conn.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
 # expire_on_commit=False so ORM objects keep their loaded attributes
 # even after the session commits and closes (important for FastAPI responses).
 SessionLocal = sessionmaker(
@@ -29,11 +69,32 @@ class Base(DeclarativeBase):
     pass
 
 
+def _dedupe_connected_playlists(conn: Connection) -> None:
+    """Drop duplicate spotify_id rows (keeping the oldest) so the unique index can be built."""
+    from backend.models import ConnectedPlaylist
+
+    # The old check-then-insert in /connect-playlist could race and store the same playlist twice.
+    # Wrapped in a derived table so MySQL accepts a subquery on the table being deleted from.
+    keep = select(func.min(ConnectedPlaylist.id)).group_by(ConnectedPlaylist.spotify_id).subquery()
+    result = conn.execute(delete(ConnectedPlaylist).where(ConnectedPlaylist.id.not_in(select(keep))))
+    if result.rowcount:
+        logger.warning("Removed %d duplicate connected playlist row(s)", result.rowcount)
+
+
 def init_db() -> None:
-    """Create all tables if they don't already exist."""
+    """Create all tables and indexes if they don't already exist."""
     from backend import models  # noqa: F401 — ensures models are registered
     Base.metadata.create_all(bind=engine)
-    logger.info("Database initialised at: %s", DATABASE_URL)
+    # create_all skips tables that already exist, so add any indexes declared since.
+    with engine.begin() as conn:
+        # One-off migration: databases from before the unique index may hold duplicates
+        existing = {ix["name"] for ix in inspect(conn).get_indexes("connected_playlists")}
+        if "uq_connected_playlists_spotify_id" not in existing:
+            _dedupe_connected_playlists(conn)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+    logger.info("Database initialised at: %s", _database_url)
 
 
 @contextmanager
@@ -1,74 +1,121 @@
+import asyncio
+import copy
+import hashlib
 import json
 import logging
 import re
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from openai import OpenAI, APIStatusError
+import httpx
+from openai import AsyncOpenAI, APIStatusError
+from sqlalchemy import delete
+from sqlalchemy.exc import SQLAlchemyError
 
-from backend.config import OPENAI_API_KEY
+from backend.config import get_settings
+from backend.database import get_session
+from backend.models import IntentCacheEntry
+
+try:
+    import re2  # google-re2: linear-time DFA matching, immune to backtracking blowups
+except ImportError:
+    re2 = None
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
-# Keyword patterns used when OpenAI is unavailable
-_PLAY_TRIGGERS      = re.compile(r"\b(play|put on|start|listen to|queue)\b", re.I)
-_SEARCH_TRIGGERS    = re.compile(r"\b(search|find|look up|show me|what is)\b", re.I)
-_RECOMMEND_TRIGGERS = re.compile(r"\b(recommend|suggest|similar to|like|vibe)\b", re.I)
-_DEVICES_TRIGGERS   = re.compile(r"\b(device|devices|speaker|player|where)\b", re.I)
-_USER_TRIGGERS      = re.compile(r"\b(who am i|logged in|my account|my profile)\b", re.I)
-# Strip leading action words to extract the raw query
+# Keyword triggers used when OpenAI is unavailable, merged into one pattern so the
+# fallback scans the input once. Each named group is a trigger family; "vibe" is
+# both a recommend trigger and a mood word, so it gets its own group.
+_KEYWORD_PATTERN = (
+    r"\b(?:"
+    r"(?P<user>who am i|logged in|my account|my profile)"
+    r"|(?P<devices>devices?|speaker|player|where)"
+    r"|(?P<vibe>vibe)"
+    r"|(?P<recommend>recommend|suggest|similar to|like)"
+    r"|(?P<search>search|find|look up|show me|what is)"
+    r"|(?P<play>play|put on|start|listen to|queue)"
+    r"|(?P<mood>lofi|lo-fi|chill|vibes|study|focus|ambient|background)"
+    r")\b"
+)
+_KEYWORD_RE = (
+    re2.compile("(?i)" + _KEYWORD_PATTERN) if re2 is not None
+    else re.compile(_KEYWORD_PATTERN, re.I)
+)
+_GROUP_HITS: dict[str, tuple[str, ...]] = {"vibe": ("recommend", "mood")}
+# Trigger family -> action, in priority order
+_KEYWORD_ACTIONS: dict[str, str] = {
+    "user": "get_current_user",
+    "devices": "list_devices",
+    "recommend": "get_recommendations",
+    "search": "search_music",
+    "play": "play_music",
+}
+# Strip leading action words to extract the raw query. The literal prefixes cover the
+# common "<verb> <query>" case without regex; _STRIP_PREFIX handles other whitespace.
+_FAST_PREFIXES = (
+    "play ", "put on ", "start ", "listen to ", "queue ",
+    "search ", "find ", "look up ", "show me ",
+    "recommend ", "suggest ", "something like ", "songs like ", "music like ",
+)
 _STRIP_PREFIX       = re.compile(
     r"^(play|put on|start|listen to|queue|search|find|look up|show me|"
     r"recommend|suggest|something like|songs like|music like)\s+",
     re.I,
 )
 
-INTENT_TOOL = {
-    "type": "function",
-    "function": {
-        "name": "resolve_intent",
-        "description": (
-            "Parse the user's natural language music request and return a structured intent. "
-            "Always call this function — never respond with plain text."
-        ),
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "action": {
-                    "type": "string",
-                    "enum": [
-                        "play_music",
-                        "search_music",
-                        "get_recommendations",
-                        "get_current_user",
-                        "list_devices",
-                        "unknown",
-                    ],
-                    "description": "The action the user wants to perform.",
-                },
-                "query": {
-                    "type": "string",
-                    "description": (
-                        "The search term, artist, song title, or genre extracted from the request. "
-                        "Empty string if not applicable."
-                    ),
-                },
-                "extras": {
-                    "type": "object",
-                    "description": "Any additional structured parameters (e.g. limit, genre, mood).",
-                    "properties": {
-                        "is_mood_or_genre": {
-                            "type": "boolean",
-                            "description": (
-                                "True if the user is asking for vibes, study music, lofi, chill tracks, "
-                                "background music, or other genre/mood-based playback rather than a specific song."
-                            ),
-                        },
+# Structured-output schema for the chat completion. Strict mode requires every
+# property to be listed in "required" and no additional properties.
+INTENT_SCHEMA = {
+    "name": "resolve_intent",
+    "description": "Parse the user's natural language music request and return a structured intent.",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": [
+                    "play_music",
+                    "search_music",
+                    "get_recommendations",
+                    "get_current_user",
+                    "list_devices",
+                    "unknown",
+                ],
+                "description": "The action the user wants to perform.",
+            },
+            "query": {
+                "type": "string",
+                "description": (
+                    "The search term, artist, song title, or genre extracted from the request. "
+                    "Empty string if not applicable."
+                ),
+            },
+            "extras": {
+                "type": "object",
+                "description": "Additional structured parameters about the request.",
+                "properties": {
+                    "is_mood_or_genre": {
+                        "type": "boolean",
+                        "description": (
+                            "True if the user is asking for vibes, study music, lofi, chill tracks, "
+                            "background music, or other genre/mood-based playback rather than a specific song."
+                        ),
                     },
-                    "additionalProperties": True,
                 },
+                "required": ["is_mood_or_genre"],
+                "additionalProperties": False,
             },
-            "required": ["action", "query"],
         },
+        "required": ["action", "query", "extras"],
+        "additionalProperties": False,
     },
 }
 
@@ -105,19 +152,54 @@ extras.is_mood_or_genre:
   - "play Drake"
   - "play the album After Hours"
 
-Always call the resolve_intent function. Never reply with plain text."""
+Always respond with a JSON object matching the resolve_intent schema. Never reply with plain text."""
+
+# Max number of distinct normalized prompts kept in the in-process intent cache
+INTENT_CACHE_MAX = 512
+# Persisted entries that were never reused are dropped after this long
+INTENT_CACHE_STALE_AFTER = timedelta(days=7)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse case and whitespace so near-identical prompts and names compare equal."""
+    return " ".join(text.lower().split())
+
+
+def strip_action_prefix(text: str) -> str:
+    """Drop a leading action verb ("play", "search", ...) from the query."""
+    lowered = text.lower()
+    for prefix in _FAST_PREFIXES:
+        if lowered.startswith(prefix):
+            return text[len(prefix):].strip()
+    return _STRIP_PREFIX.sub("", text).strip()
+
+
+def _cache_key_hash(key: str) -> str:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
 
 
 class IntentEngine:
-    def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, http_client: httpx.AsyncClient | None = None):
+        settings = get_settings()
+        self.client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            timeout=10.0,
+            max_retries=1,
+            http_client=http_client,
+        )
         self.model = "gpt-4o-mini"
+        # LRU of normalized prompt -> OpenAI intent; skips the API for repeated phrases
+        self._cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._cache_max = INTENT_CACHE_MAX
+        self._cache_enabled = settings.intent_cache_enabled
+        # Normalized prompt -> task of the parse currently talking to OpenAI
+        self._inflight: dict[str, asyncio.Task[dict[str, Any]]] = {}
 
-    def parse(self, user_input: str) -> dict[str, Any]:
+    async def parse(self, user_input: str) -> dict[str, Any]:
         """
         Parse natural language input into a structured intent dict.
 
-        Tries OpenAI function calling first; falls back to keyword matching
+        Tries OpenAI structured outputs first; falls back to keyword matching
         if the API is unavailable or over quota.
 
         Returns:
@@ -125,13 +207,50 @@ class IntentEngine:
                 "action": "play_music",
                 "query": "Drake",
                 "extras": {},
-                "source": "openai" | "fallback"
+                "source": "openai" | "cache" | "fallback"
             }
         """
         logger.info("Parsing intent for: %r", user_input)
 
+        key = normalize_text(user_input)
+        if self._cache_enabled and key in self._cache:
+            self._cache.move_to_end(key)
+            logger.info("Intent cache hit for: %r", key)
+            return copy.deepcopy(self._cache[key]) | {"source": "cache"}
+
+        # Singleflight: identical prompts arriving while one is being resolved share its result.
+        # The parse runs as its own task and every caller, the originator included, awaits it
+        # through shield(), so a cancelled request only stops waiting and never cancels the rest.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._resolve(user_input, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish_inflight(key, t))
+        else:
+            logger.info("Joining in-flight intent parse for: %r", key)
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _finish_inflight(self, key: str, task: asyncio.Task[dict[str, Any]]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved: if every caller was cancelled, nobody else will
+
+    async def _resolve(self, user_input: str, key: str) -> dict[str, Any]:
+        """Persisted cache, then OpenAI, then the keyword fallback."""
+        if self._cache_enabled:
+            stored = await asyncio.to_thread(self._load_persisted, key)
+            if stored is not None:
+                self._remember(key, stored)
+                return copy.deepcopy(stored) | {"source": "cache"}
+
         try:
-            intent = self._parse_with_openai(user_input)
+            intent = await self._parse_with_openai(user_input)
+            # Empty or malformed completions also come back as "unknown"; caching one would
+            # pin that phrase to it (persisted rows survive restarts, since their hits keep growing)
+            if self._cache_enabled and intent.get("action") != "unknown":
+                self._remember(key, intent)
+                await asyncio.to_thread(self._persist, key, intent)
             intent["source"] = "openai"
             return intent
         except APIStatusError as exc:
@@ -140,27 +259,75 @@ class IntentEngine:
             intent["source"] = "fallback"
             return intent
 
-    def _parse_with_openai(self, user_input: str) -> dict[str, Any]:
-        response = self.client.chat.completions.create(
+    def evict_stale_cache(self) -> int:
+        """Delete persisted intents that were only ever hit once and haven't been used recently."""
+        cutoff = datetime.now(timezone.utc) - INTENT_CACHE_STALE_AFTER
+        try:
+            with get_session() as session:
+                result = session.execute(
+                    delete(IntentCacheEntry).where(
+                        IntentCacheEntry.hits == 1,
+                        IntentCacheEntry.updated_at < cutoff,
+                    )
+                )
+        except SQLAlchemyError as exc:
+            logger.warning("Failed to evict stale intent cache entries: %s", exc)
+            return 0
+        logger.info("Evicted %d stale intent cache entr(ies).", result.rowcount)
+        return result.rowcount
+
+    def _remember(self, key: str, intent: dict[str, Any]) -> None:
+        self._cache[key] = copy.deepcopy(intent)
+        if len(self._cache) > self._cache_max:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _load_persisted(key: str) -> dict[str, Any] | None:
+        """Return a previously persisted intent for this key, bumping its hit count."""
+        try:
+            with get_session() as session:
+                entry = session.get(IntentCacheEntry, _cache_key_hash(key))
+                if entry is None:
+                    return None
+                entry.hits += 1
+                payload = entry.payload
+        except SQLAlchemyError as exc:
+            logger.warning("Intent cache lookup failed: %s", exc)
+            return None
+        logger.info("Persisted intent cache hit for: %r", key)
+        return payload
+
+    @staticmethod
+    def _persist(key: str, intent: dict[str, Any]) -> None:
+        try:
+            with get_session() as session:
+                session.merge(IntentCacheEntry(key_hash=_cache_key_hash(key), payload=intent, hits=1))
+        except SQLAlchemyError as exc:
+            logger.warning("Failed to persist intent cache entry: %s", exc)
+
+    async def _parse_with_openai(self, user_input: str) -> dict[str, Any]:
+        response = await self.client.chat.completions.create(
             model=self.model,
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_input},
             ],
-            tools=[INTENT_TOOL],
-            tool_choice={"type": "function", "function": {"name": "resolve_intent"}},
+            response_format={"type": "json_schema", "json_schema": INTENT_SCHEMA},
+            max_tokens=120,
+            temperature=0,
+            top_p=1,
         )
 
         message = response.choices[0].message
 
-        if not message.tool_calls:
-            logger.warning("No tool call returned — returning unknown intent.")
+        if not message.content:
+            logger.warning("No structured output returned — returning unknown intent.")
             return {"action": "unknown", "query": "", "extras": {}}
 
         try:
-            intent = json.loads(message.tool_calls[0].function.arguments)
+            intent = _json_loads(message.content)
         except json.JSONDecodeError as exc:
-            logger.error("Failed to parse tool call JSON: %s", exc)
+            logger.error("Failed to parse intent JSON: %s", exc)
             return {"action": "unknown", "query": "", "extras": {}}
 
         intent.setdefault("extras", {})
@@ -171,29 +338,27 @@ class IntentEngine:
     def _parse_with_keywords(user_input: str) -> dict[str, Any]:
         text = user_input.strip()
 
-        if _USER_TRIGGERS.search(text):
-            return {"action": "get_current_user", "query": "", "extras": {}}
+        # Nothing to match on (empty, a single character, or only punctuation/digits)
+        if len(text) < 2 or not any(c.isalpha() for c in text):
+            return {"action": "unknown", "query": "", "extras": {}}
+
+        hits: set[str] = set()
+        for match in _KEYWORD_RE.finditer(text):
+            hits.update(_GROUP_HITS.get(match.lastgroup, (match.lastgroup,)))
 
-        if _DEVICES_TRIGGERS.search(text):
-            return {"action": "list_devices", "query": "", "extras": {}}
+        # No trigger matched — treat whole input as a play query
+        action = next((a for group, a in _KEYWORD_ACTIONS.items() if group in hits), "play_music")
+
+        if action in ("get_current_user", "list_devices"):
+            return {"action": action, "query": "", "extras": {}}
 
         # Strip action verb to get the bare query
-        query = _STRIP_PREFIX.sub("", text).strip()
+        query = strip_action_prefix(text)
 
         extras: dict[str, Any] = {}
 
         # Heuristic for mood/genre style queries when OpenAI is unavailable.
-        if re.search(r"\b(lofi|lo-fi|chill|vibes?|vibe|study|focus|ambient|background)\b", text, re.I):
+        if "mood" in hits:
             extras["is_mood_or_genre"] = True
 
-        if _RECOMMEND_TRIGGERS.search(text):
-            return {"action": "get_recommendations", "query": query, "extras": extras}
-
-        if _SEARCH_TRIGGERS.search(text):
-            return {"action": "search_music", "query": query, "extras": extras}
-
-        if _PLAY_TRIGGERS.search(text):
-            return {"action": "play_music", "query": query, "extras": extras}
-
-        # No keyword matched — treat whole input as a play query
-        return {"action": "play_music", "query": text, "extras": extras}
+        return {"action": action, "query": query, "extras": extras}
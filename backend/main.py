@@ -1,39 +1,94 @@
+import asyncio
+import itertools
+import json
 import logging
 import os
-import tempfile
+import signal
+import threading
+from collections import defaultdict
 from contextlib import asynccontextmanager
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, Callable, NamedTuple
 
-from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+import httpx
+from cachetools import TTLCache
+from fastapi import BackgroundTasks, FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
-from openai import OpenAI
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
+from openai import AsyncOpenAI
 from pydantic import BaseModel
-
-from sqlalchemy import delete, func, select
-
-from backend.config import FRONTEND_URL, OPENAI_API_KEY
-from backend.spotify_client import SpotifyClient
-from backend.intent_engine import IntentEngine
+from requests.exceptions import RequestException
+from spotipy.exceptions import SpotifyException
+from spotipy.oauth2 import SpotifyOauthError
+
+from sqlalchemy import delete, desc, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.config import get_settings
+from backend.spotify_client import SpotifyClient, build_requests_session
+from backend.intent_engine import IntentEngine, normalize_text, strip_action_prefix
 from backend.database import init_db, get_session
 from backend.models import ConnectedPlaylist, MoodRequest
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
 )
 logger = logging.getLogger(__name__)
 
+if orjson is not None:
+    class _JSONResponse(JSONResponse):
+        """JSONResponse rendered by orjson; much faster on the larger track/request lists."""
+
+        def render(self, content: Any) -> bytes:
+            return orjson.dumps(content)
+else:
+    _JSONResponse = JSONResponse
+
+# Failures from the Spotify Web API, token refresh, or the HTTP layer underneath them
+SPOTIFY_ERRORS = (SpotifyException, SpotifyOauthError, RequestException)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up AI Music Assistant...")
     init_db()
-    app.state.spotify = SpotifyClient()
-    app.state.intent = IntentEngine()
+    # Long-lived HTTP clients so OpenAI and Spotify calls reuse pooled keep-alive connections.
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+    )
+    app.state.spotify_session = build_requests_session()
+    app.state.spotify = SpotifyClient(requests_session=app.state.spotify_session)
+    app.state.openai = AsyncOpenAI(api_key=get_settings().openai_api_key, http_client=app.state.http)
+    app.state.intent = IntentEngine(http_client=app.state.http)
+    app.state.intent.evict_stale_cache()
+    app.state.playlist_index = _load_playlist_index()
+    app.state.search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+    app.state.top_tracks_cache = TTLCache(maxsize=TOP_TRACKS_CACHE_SIZE, ttl=TOP_TRACKS_CACHE_TTL)
+    app.state.cache_locks = defaultdict(asyncio.Lock)
+    app.state.command_listeners = set()
+    app.state.shutting_down = asyncio.Event()
+    restore_signals = _end_streams_on_exit_signal()
+    app.state.mood_queue = asyncio.Queue()
+    app.state.mood_flusher = asyncio.create_task(_flush_mood_requests(app.state.mood_queue))
     logger.info("Spotify client and intent engine initialized.")
     yield
     logger.info("Shutting down AI Music Assistant.")
+    _end_command_streams()
+    restore_signals()
+    # Sentinel tells the flusher to write whatever is still buffered and exit.
+    await app.state.mood_queue.put(None)
+    await app.state.mood_flusher
+    await app.state.http.aclose()
+    app.state.spotify_session.close()
 
 
 app = FastAPI(
@@ -41,6 +96,7 @@ app = FastAPI(
     description="An AI-powered music assistant backed by Spotify and OpenAI.",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=_JSONResponse,
 )
 
 app.add_middleware(
@@ -78,9 +134,11 @@ async def callback(request: Request, code: str | None = None, error: str | None
     if not code:
         raise HTTPException(status_code=400, detail="Missing authorization code.")
     spotify: SpotifyClient = app.state.spotify
-    spotify.auth_manager.get_access_token(code, as_dict=False)
+    await asyncio.to_thread(spotify.auth_manager.get_access_token, code, as_dict=False)
+    # The new token may belong to a different user; top tracks are cached without one
+    app.state.top_tracks_cache.clear()
     logger.info("Spotify OAuth token obtained via callback.")
-    frontend_base = FRONTEND_URL.rstrip("/")
+    frontend_base = get_settings().frontend_url.rstrip("/")
     return RedirectResponse(url=f"{frontend_base}/#/")
 
 
@@ -89,15 +147,17 @@ async def logout():
     """Clear the cached Spotify token; next request will require re-authorization."""
     spotify: SpotifyClient = app.state.spotify
     spotify.clear_cache()
-    app.state.spotify = SpotifyClient()
+    app.state.top_tracks_cache.clear()
+    app.state.spotify = SpotifyClient(requests_session=app.state.spotify_session)
     logger.info("User logged out; Spotify client reset.")
     return {"status": "logged_out"}
 
 
-def _require_spotify_auth() -> SpotifyClient:
+async def _require_spotify_auth() -> SpotifyClient:
     """Return the Spotify client if a token is cached; otherwise raise 401 (avoids spotipy CLI prompt)."""
     spotify: SpotifyClient = app.state.spotify
-    if not spotify.has_cached_token():
+    # May refresh an expired token over the network, so keep it off the event loop
+    if not await asyncio.to_thread(spotify.has_cached_token):
         raise HTTPException(
             status_code=401,
             detail="Not authenticated with Spotify. Visit /auth to sign in.",
@@ -105,13 +165,54 @@ def _require_spotify_auth() -> SpotifyClient:
     return spotify
 
 
+# Spotify searches are cached per normalized query; top tracks change slowly but are per-user
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 600
+TOP_TRACKS_CACHE_SIZE = 32
+TOP_TRACKS_CACHE_TTL = 60
+
+
+# "&" and "and" score the same when matching track and artist names against the query
+_AMPERSAND = str.maketrans({"&": "and"})
+
+
+def _normalize_name(s: str) -> str:
+    return s.lower().translate(_AMPERSAND).strip()
+
+
+_MISSING = object()
+
+
+async def _cached(cache: TTLCache, key: tuple, fn, *args: Any, **kwargs: Any) -> Any:
+    """
+    Return cache[key], calling the blocking fn in a worker thread on a miss.
+    Concurrent misses for the same key share one call; failures are not cached.
+    """
+    # Single lookups only: a TTL entry can expire between a membership test and the read
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    locks: defaultdict[tuple, asyncio.Lock] = app.state.cache_locks
+    lock = locks[key]
+    try:
+        async with lock:
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = await asyncio.to_thread(fn, *args, **kwargs)
+                cache[key] = value
+            return value
+    finally:
+        if not lock.locked():
+            locks.pop(key, None)
+
+
 @app.get("/me")
 async def get_current_user():
     """Return the authenticated Spotify user's profile."""
-    spotify = _require_spotify_auth()
+    spotify = await _require_spotify_auth()
     try:
-        user = spotify.get_current_user()
-    except Exception as exc:
+        user = await asyncio.to_thread(spotify.get_current_user)
+    except SPOTIFY_ERRORS as exc:
         raise HTTPException(status_code=401, detail=str(exc))
     return user
 
@@ -119,10 +220,10 @@ async def get_current_user():
 @app.get("/devices")
 async def list_devices():
     """Return available Spotify playback devices."""
-    spotify = _require_spotify_auth()
+    spotify = await _require_spotify_auth()
     try:
-        devices = spotify.list_devices()
-    except Exception as exc:
+        devices = await asyncio.to_thread(spotify.list_devices)
+    except SPOTIFY_ERRORS as exc:
         raise HTTPException(status_code=401, detail=str(exc))
     return {"devices": devices}
 
@@ -133,10 +234,16 @@ async def top_tracks(limit: int = 50, time_range: str = "medium_term"):
     Return the current user's top tracks.
     time_range: short_term | medium_term | long_term
     """
-    spotify = _require_spotify_auth()
+    spotify = await _require_spotify_auth()
     try:
-        tracks = spotify.get_top_tracks(limit=limit, time_range=time_range)
-    except Exception as exc:
+        tracks = await _cached(
+            app.state.top_tracks_cache,
+            ("top", limit, time_range),
+            spotify.get_top_tracks,
+            limit=limit,
+            time_range=time_range,
+        )
+    except SPOTIFY_ERRORS as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     return {"total": len(tracks), "time_range": time_range, "tracks": tracks}
 
@@ -144,20 +251,46 @@ async def top_tracks(limit: int = 50, time_range: str = "medium_term"):
 @app.get("/my-spotify-playlists")
 async def get_my_spotify_playlists(limit: int = 50):
     """Return the current user's Spotify playlists (id, name, uri, image_url)."""
-    spotify = _require_spotify_auth()
+    spotify = await _require_spotify_auth()
     try:
-        playlists = spotify.get_my_playlists(limit=limit)
-    except Exception as exc:
+        playlists = await asyncio.to_thread(spotify.get_my_playlists, limit=limit)
+    except SPOTIFY_ERRORS as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     return {"playlists": playlists}
 
 
+class PlaylistRef(NamedTuple):
+    name: str
+    uri: str
+
+
+def _load_playlist_index() -> dict[str, PlaylistRef]:
+    """Connected playlists keyed by lowercased name, so /play can match without a DB query."""
+    with get_session() as session:
+        rows = session.execute(
+            select(ConnectedPlaylist.name, ConnectedPlaylist.uri).order_by(ConnectedPlaylist.id)
+        ).all()
+    index: dict[str, PlaylistRef] = {}
+    for name, uri in rows:
+        index.setdefault(normalize_text(name), PlaylistRef(name, uri))
+    return index
+
+
 @app.get("/connected-playlists")
 async def get_connected_playlists():
     """Return all ConnectedPlaylist records from the database."""
     with get_session() as session:
-        result = session.execute(select(ConnectedPlaylist))
-        rows = result.scalars().all()
+        rows = session.execute(
+            select(
+                ConnectedPlaylist.id,
+                ConnectedPlaylist.user_id,
+                ConnectedPlaylist.spotify_id,
+                ConnectedPlaylist.name,
+                ConnectedPlaylist.uri,
+                ConnectedPlaylist.image_url,
+                ConnectedPlaylist.created_at,
+            )
+        ).all()
     return [
         {
             "id": row.id,
@@ -179,25 +312,50 @@ class ConnectPlaylistRequest(BaseModel):
     image_url: str | None = None
 
 
+# Dialect inserts that support ON CONFLICT DO NOTHING
+_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _insert_connected_playlist(session: Session, values: dict[str, Any]) -> bool:
+    """Check-then-insert for dialects without ON CONFLICT; False if the playlist already exists."""
+    exists = session.execute(
+        select(ConnectedPlaylist.id).where(ConnectedPlaylist.spotify_id == values["spotify_id"])
+    ).first()
+    if exists is not None:
+        return False
+    try:
+        with session.begin_nested():
+            session.add(ConnectedPlaylist(**values))
+    except IntegrityError:
+        return False
+    return True
+
+
 @app.post("/connect-playlist")
 async def connect_playlist(body: ConnectPlaylistRequest):
     """Add a playlist to connected playlists if not already present (by spotify_id)."""
+    values = {
+        "user_id": None,
+        "spotify_id": body.spotify_id,
+        "name": body.name,
+        "uri": body.uri,
+        "image_url": body.image_url,
+    }
     with get_session() as session:
-        existing = session.execute(
-            select(ConnectedPlaylist).where(ConnectedPlaylist.spotify_id == body.spotify_id)
-        )
-        if existing.scalars().first() is not None:
-            return {"status": "already_connected", "spotify_id": body.spotify_id}
-        session.add(
-            ConnectedPlaylist(
-                user_id=None,
-                spotify_id=body.spotify_id,
-                name=body.name,
-                uri=body.uri,
-                image_url=body.image_url,
+        insert = _INSERTS.get(session.get_bind().dialect.name)
+        if insert is not None:
+            result = session.execute(
+                insert(ConnectedPlaylist)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=[ConnectedPlaylist.spotify_id])
             )
-        )
-        session.commit()
+            inserted = result.rowcount > 0
+        else:
+            # No portable upsert: check, then let the unique index catch a concurrent insert
+            inserted = _insert_connected_playlist(session, values)
+    if not inserted:
+        return {"status": "already_connected", "spotify_id": body.spotify_id}
+    app.state.playlist_index = _load_playlist_index()
     return {"status": "connected", "spotify_id": body.spotify_id}
 
 
@@ -209,28 +367,40 @@ async def disconnect_playlist(spotify_id: str):
         session.commit()
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail=f"No connected playlist with spotify_id: {spotify_id}")
+    app.state.playlist_index = _load_playlist_index()
     return {"status": "disconnected", "spotify_id": spotify_id}
 
 
+# Voice commands are a few seconds long; larger uploads are stray recordings not worth the latency
+TRANSCRIBE_MODEL = "gpt-4o-mini-transcribe"
+TRANSCRIBE_MAX_BYTES = 5 * 1024 * 1024
+
+
 @app.post("/transcribe")
 async def transcribe_audio(file: UploadFile = File(...)):
-    """Accept an audio blob, transcribe with OpenAI Whisper, return { text }."""
-    tmp_path = None
+    """Accept an audio blob, transcribe it with OpenAI, return { text }."""
+    size = file.size
+    if size is None:
+        # No size from the client (e.g. a chunked upload): measure the spooled body instead
+        size = file.file.seek(0, os.SEEK_END)
+        file.file.seek(0)
+    if size > TRANSCRIBE_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Audio clip too large ({size} bytes, max {TRANSCRIBE_MAX_BYTES}).",
+        )
+    # UploadFile is already spooled by Starlette; hand its file object to the SDK rather
+    # than reading it into memory and copying it to another temp file.
+    upload = (file.filename or "audio.webm", file.file, file.content_type or "audio/webm")
     try:
-        content = await file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        with open(tmp_path, "rb") as f:
-            result = client.audio.transcriptions.create(model="whisper-1", file=f)
-        return {"text": result.text}
+        client: AsyncOpenAI = app.state.openai
+        text = await client.audio.transcriptions.create(
+            model=TRANSCRIBE_MODEL, file=upload, response_format="text"
+        )
+        return {"text": text.strip()}
     except Exception as exc:
         logger.exception("Transcribe failed: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc))
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
 
 
 class PlayRequest(BaseModel):
@@ -249,6 +419,11 @@ class PlayTrackRequest(BaseModel):
     device_id: str | None = None
 
 
+# Buffered mood requests are written once this many are pending, or after this many seconds
+MOOD_FLUSH_BATCH = 50
+MOOD_FLUSH_INTERVAL = 0.5
+
+
 def _save_mood_request(
     message: str,
     intent: dict,
@@ -256,19 +431,118 @@ def _save_mood_request(
     *,
     mode: str | None = None,
 ) -> None:
-    """Persist a mood request to the database for the voice UI."""
+    """Queue a mood request for the voice UI; the background flusher persists it in batches."""
     action = mode if mode else intent.get("action")
+    app.state.mood_queue.put_nowait(MoodRequest(
+        user_id=None,
+        message=message,
+        resolved_action=action,
+        resolved_query=resolved_query,
+        intent_source=intent.get("source"),
+        created_at=datetime.now(timezone.utc),
+    ))
+
+
+def _mood_request_dict(r: Any) -> dict[str, Any]:
+    return {
+        "id": r.id,
+        "message": r.message,
+        "resolved_action": r.resolved_action,
+        "resolved_query": r.resolved_query,
+        "intent_source": r.intent_source,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+    }
+
+
+def _write_mood_requests(rows: list[MoodRequest]) -> bool:
     try:
         with get_session() as session:
-            session.add(MoodRequest(
-                user_id=None,
-                message=message,
-                resolved_action=action,
-                resolved_query=resolved_query,
-                intent_source=intent.get("source"),
-            ))
+            session.add_all(rows)
+    except SQLAlchemyError as exc:
+        logger.warning("Failed to save %d mood request(s): %s", len(rows), exc)
+        return False
+    return True
+
+
+def _publish_mood_requests(rows: list[MoodRequest]) -> None:
+    """Push newly saved mood requests to every /latest-command/stream listener."""
+    listeners: set[asyncio.Queue] = app.state.command_listeners
+    for row in rows:
+        item = _mood_request_dict(row)
+        for listener in listeners:
+            listener.put_nowait(item)
+
+
+async def _flush_mood_requests(queue: asyncio.Queue) -> None:
+    """Drain the mood request queue until a None sentinel arrives, committing rows in batches."""
+    loop = asyncio.get_running_loop()
+    buffer: list[MoodRequest] = []
+    deadline = 0.0
+    stopping = False
+    while not stopping:
+        timeout = max(deadline - loop.time(), 0.0) if buffer else None
+        try:
+            row = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        else:
+            if row is None:
+                stopping = True
+            else:
+                if not buffer:
+                    deadline = loop.time() + MOOD_FLUSH_INTERVAL
+                buffer.append(row)
+        if buffer and (stopping or len(buffer) >= MOOD_FLUSH_BATCH or loop.time() >= deadline):
+            if await asyncio.to_thread(_write_mood_requests, buffer):
+                _publish_mood_requests(buffer)
+            buffer = []
+
+
+async def _cached_search(spotify: SpotifyClient, query: str, limit: int = 10) -> list[dict[str, Any]]:
+    """search_track through the shared search cache."""
+    key = ("track", normalize_text(query), limit)
+    return list(await _cached(app.state.search_cache, key, spotify.search_track, query, limit))
+
+
+async def _search_playlist_uris(spotify: SpotifyClient, query: str) -> list[str]:
+    """Track URIs of the best matching Spotify playlist, or [] if the search fails."""
+    key = ("playlist", normalize_text(query), 1)
+    try:
+        return list(await _cached(app.state.search_cache, key, spotify.search_playlists, query, 1))
+    except SPOTIFY_ERRORS as exc:
+        logger.warning("Playlist search for %r failed: %s", query, exc)
+        return []
+
+
+def _match_connected_playlist(message: str) -> PlaylistRef | None:
+    """Connected playlist named verbatim by the message ("play chill mix", "play my chill mix")."""
+    name = strip_action_prefix(normalize_text(message))
+    index: dict[str, PlaylistRef] = app.state.playlist_index
+    return index.get(name) or (index.get(name[3:]) if name.startswith("my ") else None)
+
+
+async def _play_connected_playlist(
+    spotify: SpotifyClient, playlist: PlaylistRef, device_id: str | None
+) -> dict[str, Any]:
+    ctx = await asyncio.to_thread(spotify.play_playlist, playlist.uri, device_id=device_id)
+    return {
+        "status": "playing",
+        "mode": "playlist",
+        "playlist": playlist.name,
+        "uri": playlist.uri,
+        "device_id": ctx.get("device_id"),
+        "shuffle": ctx.get("shuffle", True),
+    }
+
+
+async def _record_playlist_command(message: str, playlist: PlaylistRef) -> None:
+    """Parse a fast-pathed playlist command after the response so its mood request has an intent."""
+    try:
+        intent = await app.state.intent.parse(message)
     except Exception as exc:
-        logger.warning("Failed to save mood request: %s", exc)
+        logger.warning("Intent parse for %r failed: %s", message, exc)
+        intent = {}
+    _save_mood_request(message, intent, playlist.name, mode="playlist")
 
 
 def _resolve_play_query(intent: dict, message: str) -> str:
@@ -282,18 +556,18 @@ def _resolve_play_query(intent: dict, message: str) -> str:
 @app.post("/play-track")
 async def play_track_by_uri(body: PlayTrackRequest):
     """Play a specific track by Spotify URI (e.g. spotify:track:xxx)."""
-    spotify = _require_spotify_auth()
+    spotify = await _require_spotify_auth()
     if not body.uri or not body.uri.strip().startswith("spotify:track:"):
         raise HTTPException(status_code=400, detail="Invalid track URI. Use spotify:track:xxx")
     try:
-        ctx = spotify.play_uri(body.uri.strip(), device_id=body.device_id)
-    except Exception as exc:
+        ctx = await asyncio.to_thread(spotify.play_uri, body.uri.strip(), device_id=body.device_id)
+    except SPOTIFY_ERRORS as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     return {"status": "playing", "uri": body.uri, **ctx}
 
 
 @app.post("/play")
-async def play_track(body: PlayRequest):
+async def play_track(body: PlayRequest, background_tasks: BackgroundTasks):
     """
     Natural language → one of three playback modes (all with shuffle on):
 
@@ -302,11 +576,18 @@ async def play_track(body: PlayRequest):
     - **multi**  — genre/mood query         (e.g. "Play lofi", "Play krnb")
     """
     logger.info("\n" + "=" * 40 + "\n🎙️ RECEIVED VOICE COMMAND: '%s'\n" + "=" * 40, body.message)
-    spotify = _require_spotify_auth()
+    spotify = await _require_spotify_auth()
     intent_engine: IntentEngine = app.state.intent
 
+    # "play <connected playlist name>" needs no intent parse; parse afterwards just for the log
+    playlist = _match_connected_playlist(body.message)
+    if playlist:
+        resp = await _play_connected_playlist(spotify, playlist, body.device_id)
+        background_tasks.add_task(_record_playlist_command, body.message, playlist)
+        return resp
+
     try:
-        intent = intent_engine.parse(body.message)
+        intent = await intent_engine.parse(body.message)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Intent engine error: {exc}")
 
@@ -314,87 +595,84 @@ async def play_track(body: PlayRequest):
     logger.info("Resolved intent: %s | query: %r", intent, query)
 
     # Check for a matching connected playlist by name (case-insensitive)
-    with get_session() as session:
-        match = session.execute(
-            select(ConnectedPlaylist).where(
-                func.lower(ConnectedPlaylist.name) == query.lower().strip()
-            )
-        )
-        playlist = match.scalars().first()
+    playlist = app.state.playlist_index.get(normalize_text(query))
     if playlist:
-        ctx = spotify.play_playlist(playlist.uri, device_id=body.device_id)
-        resp = {
-            "status": "playing",
-            "mode": "playlist",
-            "playlist": playlist.name,
-            "uri": playlist.uri,
-            "device_id": ctx.get("device_id"),
-            "shuffle": ctx.get("shuffle", True),
-        }
+        resp = await _play_connected_playlist(spotify, playlist, body.device_id)
         _save_mood_request(body.message, intent, playlist.name, mode="playlist")
         return resp
 
-    results = spotify.search_track(query, limit=10)
+    results = await _cached_search(spotify, query, limit=10)
     if not results:
         raise HTTPException(status_code=404, detail=f"No tracks found for: '{query}'")
 
     # Score candidates by popularity and how well their metadata matches the query.
-    def _normalize(s: str) -> str:
-        return s.lower().replace("&", "and").strip()
+    q_lower = query.lower()
+    q_norm = _normalize_name(query)
 
     def _score_track(t: dict[str, Any]) -> int:
-        base_pop = t.get("popularity") or 0
-        bonus = 0
-        q_norm = _normalize(query)
-        track_name = _normalize(t.get("name") or "")
-        artists_str = _normalize(" ".join(t.get("artists") or []))
-
+        artists = t.get("artists") or ()
+        score = t.get("popularity") or 0
         # +50 if any artist name appears anywhere in the query
-        for artist in (t.get("artists") or []):
-            if _normalize(artist) in q_norm:
-                bonus += 50
-                break
-
+        if any(_normalize_name(artist) in q_norm for artist in artists):
+            score += 50
         # +50 if the track name is a direct match to the (normalized) query
-        if track_name == q_norm:
-            bonus += 50
-
-        return base_pop + bonus
+        if _normalize_name(t.get("name") or "") == q_norm:
+            score += 50
+        return score
 
-    results = sorted(results, key=_score_track, reverse=True)
-
-    track = results[0]
-    query_words = set(query.lower().split())
-    top_artist_words = set((track["artists"][0] if track.get("artists") else "").lower().split())
-    track_name_words = set(track["name"].lower().split())
+    # Only the best candidate is needed; max() keeps the first of any ties, like a stable sort.
+    track = max(results, key=_score_track)
+    query_words = frozenset(q_lower.split())
+    top_artist = track["artists"][0] if track.get("artists") else ""
 
     extras = intent.get("extras") or {}
     is_mood_or_genre = bool(extras.get("is_mood_or_genre"))
 
-    artist_named = bool(top_artist_words & query_words)
+    artist_named = any(w in query_words for w in top_artist.lower().split())
 
     playlist_uris: list[str] = []
     is_diverse = False
 
     if not artist_named or is_mood_or_genre:
+        # The " mix" pool is only needed for non-mood queries whose first page is a single
+        # artist, and only used if no playlist turns up — fetch it alongside the playlist.
+        first_artists = {a for t in results for a in t.get("artists", ())}
+        widen = not is_mood_or_genre and len(first_artists) < 2
+
         # Genre/mood query — first try a curated playlist (e.g. "study lofi" → study playlist)
-        try:
-            playlist_uris = spotify.search_playlists(query, limit=1)
-        except Exception as exc:
-            logger.warning("Playlist search for %r failed: %s", query, exc)
+        if widen:
+            # The mix search is speculative: its failure only matters if it ends up being used
+            playlist_uris, extra = await asyncio.gather(
+                _search_playlist_uris(spotify, query),
+                _cached_search(spotify, f"{query} mix", limit=10),
+                return_exceptions=True,
+            )
+            if isinstance(playlist_uris, BaseException):
+                raise playlist_uris
+        else:
+            playlist_uris = await _search_playlist_uris(spotify, query)
 
         if not playlist_uris and not is_mood_or_genre:
-            # Fallback: widen the pool with a second track search
-            extra = spotify.search_track(f"{query} mix", limit=10)
-            seen = {t["id"] for t in results}
-            results += [t for t in extra if t["id"] not in seen]
-            unique_artists = {a for t in results for a in t.get("artists", [])}
-            is_diverse = len(unique_artists) >= 2
+            if not widen:
+                # The first page already spans several artists; no need to widen it
+                is_diverse = True
+            else:
+                if isinstance(extra, BaseException):
+                    raise extra
+                # Fallback: merge the " mix" pool by id, collecting artists in the same pass
+                by_id: dict[str, dict[str, Any]] = {}
+                unique_artists: set[str] = set()
+                for t in itertools.chain(results, extra):
+                    if t["id"] not in by_id:
+                        by_id[t["id"]] = t
+                        unique_artists.update(t.get("artists", ()))
+                results = list(by_id.values())
+                is_diverse = len(unique_artists) >= 2
 
     try:
         if playlist_uris:
             # Playlist-based multi playback (no artist list, but better curated tracks)
-            ctx = spotify.play_multi_track(playlist_uris, device_id=body.device_id)
+            ctx = await asyncio.to_thread(spotify.play_multi_track, playlist_uris, device_id=body.device_id)
             resp = {
                 "status": "playing",
                 "mode": "multi",
@@ -406,7 +684,7 @@ async def play_track(body: PlayRequest):
 
         elif is_diverse:
             # Genre/mood — queue everything, let Spotify shuffle
-            ctx = spotify.play_multi_track(results, device_id=body.device_id)
+            ctx = await asyncio.to_thread(spotify.play_multi_track, results, device_id=body.device_id)
             resp = {
                 "status": "playing",
                 "mode": "multi",
@@ -416,9 +694,9 @@ async def play_track(body: PlayRequest):
                 "device_id": ctx["device_id"],
             }
 
-        elif artist_named and not (track_name_words & query_words):
+        elif artist_named and not any(w in query_words for w in track["name"].lower().split()):
             # Only artist name in query — play full artist catalogue
-            ctx = spotify.play_artist(track, device_id=body.device_id)
+            ctx = await asyncio.to_thread(spotify.play_artist, track, device_id=body.device_id)
             resp = {
                 "status": "playing",
                 "mode": "artist",
@@ -429,7 +707,7 @@ async def play_track(body: PlayRequest):
 
         else:
             # Specific song — play that track with shuffle on
-            ctx = spotify.play_track(track, device_id=body.device_id)
+            ctx = await asyncio.to_thread(spotify.play_track, track, device_id=body.device_id)
             resp = {
                 "status": "playing",
                 "mode": "track",
@@ -443,7 +721,7 @@ async def play_track(body: PlayRequest):
         _save_mood_request(body.message, intent, query, mode=resp.get("mode"))
         return resp
 
-    except Exception as exc:
+    except (*SPOTIFY_ERRORS, ValueError) as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
 
@@ -457,7 +735,7 @@ async def ask(body: AskRequest):
     """Parse a natural language message and return the resolved intent."""
     intent_engine: IntentEngine = app.state.intent
     try:
-        intent = intent_engine.parse(body.message)
+        intent = await intent_engine.parse(body.message)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
     _save_mood_request(body.message, intent, intent.get("query"))
@@ -470,13 +748,19 @@ async def get_latest_command():
     Return the most recent voice/text command (for frontend polling).
     Shows what the user just said via voice or typed.
     """
-    from sqlalchemy import desc, select
-
     with get_session() as session:
         result = session.execute(
-            select(MoodRequest).order_by(desc(MoodRequest.created_at)).limit(1)
+            select(
+                MoodRequest.id,
+                MoodRequest.message,
+                MoodRequest.resolved_action,
+                MoodRequest.resolved_query,
+                MoodRequest.created_at,
+            )
+            .order_by(desc(MoodRequest.created_at), desc(MoodRequest.id))
+            .limit(1)
         )
-        row = result.scalars().first()
+        row = result.first()
     if not row:
         return {"latest": None}
     return {
@@ -490,31 +774,99 @@ async def get_latest_command():
     }
 
 
+# Comment line sent to idle /latest-command/stream clients so proxies keep the connection open
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _end_command_streams() -> None:
+    """Wake every /latest-command/stream generator with a None sentinel so its response ends."""
+    app.state.shutting_down.set()
+    for listener in app.state.command_listeners:
+        listener.put_nowait(None)
+
+
+def _end_streams_on_exit_signal() -> Callable[[], None]:
+    """
+    Chain onto the server's SIGINT/SIGTERM handlers so open event streams end as soon as
+    shutdown starts. uvicorn waits for every connection to close before it runs lifespan
+    teardown, so ending them from teardown alone would leave shutdown (and --reload) hanging.
+    Returns a function that puts the previous handlers back.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None   # signal handlers can only be set from the main thread
+    loop = asyncio.get_running_loop()
+    previous: dict[int, Any] = {}
+
+    def handle(sig: int, frame: Any) -> None:
+        loop.call_soon_threadsafe(_end_command_streams)
+        handler = previous[sig]
+        if callable(handler):
+            handler(sig, frame)
+        else:
+            # SIG_DFL / SIG_IGN: hand the signal back to that disposition
+            signal.signal(sig, handler)
+            signal.raise_signal(sig)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous[sig] = signal.signal(sig, handle)
+
+    def restore() -> None:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    return restore
+
+
+@app.get("/latest-command/stream")
+async def stream_latest_commands(request: Request):
+    """
+    Server-Sent Events feed of mood requests as they are saved.
+    Lets the voice UI update on new commands instead of polling /mood-requests.
+    """
+    listener: asyncio.Queue = asyncio.Queue()
+    shutting_down: asyncio.Event = app.state.shutting_down
+
+    async def events():
+        app.state.command_listeners.add(listener)
+        try:
+            while not shutting_down.is_set() and not await request.is_disconnected():
+                try:
+                    item = await asyncio.wait_for(listener.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                else:
+                    if item is None:   # server shutting down
+                        break
+                    yield f"data: {json.dumps(item)}\n\n"
+        finally:
+            app.state.command_listeners.discard(listener)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
 @app.get("/mood-requests")
 async def get_mood_requests(limit: int = 5):
     """
     Return the latest mood requests (voice/text commands and their resolved intents).
     Used by the frontend VoiceAssistant for real-time display.
     """
-    from sqlalchemy import desc, select
-
     with get_session() as session:
-        result = session.execute(
-            select(MoodRequest).order_by(desc(MoodRequest.created_at)).limit(limit)
-        )
-        items = result.scalars().all()
-    return {
-        "requests": [
-            {
-                "id": r.id,
-                "message": r.message,
-                "resolved_action": r.resolved_action,
-                "resolved_query": r.resolved_query,
-                "intent_source": r.intent_source,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-            }
-            for r in items
-        ],
-    }
+        items = session.execute(
+            select(
+                MoodRequest.id,
+                MoodRequest.message,
+                MoodRequest.resolved_action,
+                MoodRequest.resolved_query,
+                MoodRequest.intent_source,
+                MoodRequest.created_at,
+            )
+            .order_by(desc(MoodRequest.created_at), desc(MoodRequest.id))
+            .limit(limit)
+        ).all()
+    return {"requests": [_mood_request_dict(r) for r in items]}
 
 
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.database import Base
@@ -44,7 +44,7 @@ class TrackHistory(Base):
     __tablename__ = "track_history"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     spotify_track_id: Mapped[str] = mapped_column(String(64), nullable=False)
     track_name: Mapped[str] = mapped_column(String(256), nullable=False)
     artists: Mapped[str] = mapped_column(String(512), nullable=False)  # comma-separated
@@ -59,6 +59,11 @@ class TrackHistory(Base):
         return f"<TrackHistory track={self.track_name!r} action={self.action!r}>"
 
 
+# Recent history per user (WHERE user_id = ? ORDER BY played_at DESC) without a sort step;
+# the leading user_id column also covers plain user_id lookups.
+Index("ix_track_history_user_played", TrackHistory.user_id, TrackHistory.played_at.desc())
+
+
 class MoodRequest(Base):
     """A natural language message the user sent to the intent engine."""
 
@@ -69,7 +74,7 @@ class MoodRequest(Base):
     message: Mapped[str] = mapped_column(Text, nullable=False)
     resolved_action: Mapped[str | None] = mapped_column(String(64))
     resolved_query: Mapped[str | None] = mapped_column(String(256))
-    intent_source: Mapped[str | None] = mapped_column(String(32))  # openai | fallback
+    intent_source: Mapped[str | None] = mapped_column(String(32))  # openai | cache | fallback
     similarity_score: Mapped[float | None] = mapped_column(Float)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now)
 
@@ -79,6 +84,10 @@ class MoodRequest(Base):
         return f"<MoodRequest message={self.message[:40]!r} action={self.resolved_action!r}>"
 
 
+# Serves "latest N requests" (ORDER BY created_at DESC, id DESC LIMIT N) straight from the index.
+Index("ix_mood_requests_created_at_desc", MoodRequest.created_at.desc(), MoodRequest.id.desc())
+
+
 class ConnectedPlaylist(Base):
     """A playlist linked by the user for the Connected Playlists feature."""
 
@@ -86,7 +95,7 @@ class ConnectedPlaylist(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
-    spotify_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    spotify_id: Mapped[str] = mapped_column(String(64), nullable=False)
     name: Mapped[str] = mapped_column(String(256), nullable=False)
     uri: Mapped[str] = mapped_column(String(128), nullable=False)
     image_url: Mapped[str | None] = mapped_column(String(512), nullable=True)
@@ -96,3 +105,22 @@ class ConnectedPlaylist(Base):
 
     def __repr__(self) -> str:
         return f"<ConnectedPlaylist name={self.name!r} spotify_id={self.spotify_id!r}>"
+
+
+# Unique so /connect-playlist can insert with ON CONFLICT DO NOTHING; named apart from the
+# old non-unique ix_connected_playlists_spotify_id so init_db adds it to existing databases.
+Index("uq_connected_playlists_spotify_id", ConnectedPlaylist.spotify_id, unique=True)
+
+
+class IntentCacheEntry(Base):
+    """A parsed OpenAI intent, keyed by a hash of the normalized user message."""
+
+    __tablename__ = "intent_cache"
+
+    key_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    hits: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now, onupdate=_now)
+
+    def __repr__(self) -> str:
+        return f"<IntentCacheEntry key_hash={self.key_hash!r} hits={self.hits!r}>"
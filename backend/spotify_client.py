@@ -1,18 +1,26 @@
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
+import requests
 import spotipy
+from requests.adapters import HTTPAdapter
 from spotipy.oauth2 import SpotifyOAuth
+from urllib3.util.retry import Retry
 
-from backend.config import (
-    SPOTIFY_CACHE_PATH,
-    SPOTIFY_CLIENT_ID,
-    SPOTIFY_CLIENT_SECRET,
-    SPOTIFY_REDIRECT_URI,
-)
+from backend.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Runs independent Spotify requests side by side: device lookups, playlist pages
+_request_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="spotify-request")
+
+# Spotify returns at most 100 playlist items per page; cap how many tracks a search-picked
+# playlist contributes so start_playback's URI list stays a reasonable size.
+PLAYLIST_PAGE_SIZE = 100
+PLAYLIST_MAX_TRACKS = 500
+_PLAYLIST_ITEM_FIELDS = "items(track(uri)),total"
+
 SCOPES = (
     "user-read-playback-state "
     "user-modify-playback-state "
@@ -22,18 +30,45 @@ SCOPES = (
 )
 
 
+
+def build_requests_session(pool_connections: int = 20, pool_maxsize: int = 40) -> requests.Session:
+    """
+    A pooled keep-alive session for spotipy.
+
+    spotipy only installs its retry policy on sessions it builds itself, so a
+    shared session has to carry the same policy: retry 429/5xx with backoff.
+    """
+    retry = Retry(
+        total=spotipy.Spotify.max_retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=spotipy.Spotify.max_retries,
+        backoff_factor=0.3,
+        status_forcelist=spotipy.Spotify.default_retry_codes,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
 class SpotifyClient:
-    def __init__(self):
-        self._cache_path = SPOTIFY_CACHE_PATH
+    def __init__(self, requests_session: requests.Session | None = None):
+        settings = get_settings()
+        self._cache_path = settings.spotify_cache_path
         self.auth_manager = SpotifyOAuth(
-            client_id=SPOTIFY_CLIENT_ID,
-            client_secret=SPOTIFY_CLIENT_SECRET,
-            redirect_uri=SPOTIFY_REDIRECT_URI,
+            client_id=settings.spotify_client_id,
+            client_secret=settings.spotify_client_secret,
+            redirect_uri=settings.spotify_redirect_uri,
             scope=SCOPES,
             open_browser=False,
-            cache_path=SPOTIFY_CACHE_PATH,
+            cache_path=settings.spotify_cache_path,
+        )
+        self.client = spotipy.Spotify(
+            auth_manager=self.auth_manager,
+            requests_session=requests_session or True,
         )
-        self.client = spotipy.Spotify(auth_manager=self.auth_manager)
 
     def clear_cache(self) -> None:
         """Remove the cached Spotify token so the next request requires re-authorization."""
@@ -106,14 +141,21 @@ class SpotifyClient:
         if not playlist_id:
             return []
 
-        tracks_resp = self.client.playlist_items(playlist_id, limit=100)
-        items = tracks_resp.get("items", [])
+        # First page gives the total; the remaining pages are fetched concurrently, in order.
+        first = self._playlist_page(playlist_id, 0)
+        total = min(first.get("total") or 0, PLAYLIST_MAX_TRACKS)
+        pages = [first]
+        pages.extend(_request_pool.map(
+            lambda offset: self._playlist_page(playlist_id, offset),
+            range(PLAYLIST_PAGE_SIZE, total, PLAYLIST_PAGE_SIZE),
+        ))
         uris: list[str] = []
-        for item in items:
-            track = item.get("track") or {}
-            uri = track.get("uri")
-            if uri:
-                uris.append(uri)
+        for page in pages:
+            for item in page.get("items", []):
+                track = item.get("track") or {}
+                uri = track.get("uri")
+                if uri:
+                    uris.append(uri)
 
         logger.info(
             "Playlist search '%s' using playlist '%s' yielded %d track URIs.",
@@ -123,6 +165,11 @@ class SpotifyClient:
         )
         return uris
 
+    def _playlist_page(self, playlist_id: str, offset: int) -> dict[str, Any]:
+        return self.client.playlist_items(
+            playlist_id, fields=_PLAYLIST_ITEM_FIELDS, limit=PLAYLIST_PAGE_SIZE, offset=offset
+        )
+
     def get_top_tracks(
         self,
         limit: int = 50,
@@ -168,8 +215,7 @@ class SpotifyClient:
         device_id: str | None = None,
     ) -> dict[str, Any]:
         """Play a track directly by Spotify URI (e.g. spotify:track:xxx) with album context for autoplay."""
-        if not device_id or device_id.lower() == "string":
-            device_id = self._get_active_device_id()
+        device = self._start_device_lookup(device_id)
 
         # Try to fetch album context so Spotify can autoplay subsequent tracks naturally.
         album_uri: str | None = None
@@ -177,8 +223,9 @@ class SpotifyClient:
             track = self.client.track(uri)
             album_uri = (track.get("album") or {}).get("uri")
             uri = track.get("uri") or uri
-        except Exception:
+        except (spotipy.SpotifyException, requests.RequestException):
             logger.warning("Failed to fetch track metadata for %s; falling back to single-track playback.", uri)
+        device_id = device.result()
 
         if album_uri:
             self.client.start_playback(
@@ -217,8 +264,7 @@ class SpotifyClient:
         Play the requested track followed by 30 similar recommendations (radio-style autoplay).
         Shuffle is off so the requested song always plays first.
         """
-        if not device_id or device_id.lower() == "string":
-            device_id = self._get_active_device_id()
+        device = self._start_device_lookup(device_id)
 
         uri = track.get("uri")
         track_id = track.get("id")
@@ -238,8 +284,9 @@ class SpotifyClient:
                     "Recommendations for '%s': %d tracks queued.",
                     track.get("name"), len(rec_uris),
                 )
-            except Exception as exc:
+            except (spotipy.SpotifyException, requests.RequestException) as exc:
                 logger.warning("Recommendations API failed for %r: %s — playing track alone.", track_id, exc)
+        device_id = device.result()
 
         self.client.start_playback(device_id=device_id, uris=uris)
         # Shuffle OFF so the requested track always plays first
@@ -291,8 +338,9 @@ class SpotifyClient:
             uris = [u for u in tracks if u]
             unique_artists = []
         else:
-            uris = [t["uri"] for t in tracks if t.get("uri")]
-            unique_artists = list({a for t in tracks for a in t.get("artists", [])})
+            uris = [uri for t in tracks if (uri := t.get("uri"))]
+            # dict.fromkeys dedupes in one pass and keeps first-seen order
+            unique_artists = list(dict.fromkeys(a for t in tracks for a in t.get("artists", ())))
 
         if uris:
             self.client.start_playback(device_id=device_id, uris=uris)
@@ -316,6 +364,14 @@ class SpotifyClient:
     # Helpers
     # ------------------------------------------------------------------
 
+    def _start_device_lookup(self, device_id: str | None) -> Future:
+        """Future for the playback device; resolves the active device in the background if none given."""
+        if device_id and device_id.lower() != "string":
+            done: Future = Future()
+            done.set_result(device_id)
+            return done
+        return _request_pool.submit(self._get_active_device_id)
+
     def _get_active_device_id(self) -> str | None:
         """Return the active device ID, falling back to the first available device."""
         devices = self.client.devices().get("devices", [])
@@ -335,26 +391,35 @@ class SpotifyClient:
 
     @staticmethod
     def _format_track(track: dict[str, Any]) -> dict[str, Any]:
-        artists_raw = track.get("artists", [])
-        album_raw = track.get("album", {}) or {}
-        album_images = album_raw.get("images", [])
+        # One pass over artists for both names and URIs; this runs for every search/top-track item
+        artist_names: list[str] = []
+        artist_uris: list[str] = []
+        for a in track.get("artists", ()):
+            artist_names.append(a["name"])
+            if a_uri := a.get("uri"):
+                artist_uris.append(a_uri)
+        album_raw = track.get("album") or {}
+        album_uri = album_raw.get("uri")
         result = {
             "id": track["id"],
             "name": track["name"],
             "uri": track.get("uri"),
-            "artists": [a["name"] for a in artists_raw],
-            "artist_uris": [a["uri"] for a in artists_raw if a.get("uri")],
+            "artists": artist_names,
+            "artist_uris": artist_uris,
             "album": {
                 "name": album_raw.get("name"),
-                "uri": album_raw.get("uri"),
-                "images": [{"url": img.get("url"), "height": img.get("height"), "width": img.get("width")} for img in album_images],
+                "uri": album_uri,
+                "images": [
+                    {"url": img.get("url"), "height": img.get("height"), "width": img.get("width")}
+                    for img in album_raw.get("images", ())
+                ],
             },
-            "album_uri": album_raw.get("uri"),
+            "album_uri": album_uri,
             "duration_ms": track.get("duration_ms"),
-            "external_url": track.get("external_urls", {}).get("spotify"),
+            "external_url": (track.get("external_urls") or {}).get("spotify"),
         }
-        if track.get("popularity") is not None:
-            result["popularity"] = track["popularity"]
-        if track.get("preview_url") is not None:
-            result["preview_url"] = track["preview_url"]
+        if (popularity := track.get("popularity")) is not None:
+            result["popularity"] = popularity
+        if (preview_url := track.get("preview_url")) is not None:
+            result["preview_url"] = preview_url
         return result
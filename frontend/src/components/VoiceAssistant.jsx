@@ -2,7 +2,7 @@ import { useEffect, useRef, useState } from 'react'
 import { apiUrl } from '../api'
 
 const HOTKEY = 'Ctrl + Shift + Space'
-const POLL_INTERVAL_MS = 2500
+const RECENT_LIMIT = 3
 const PULSE_DURATION_MS = 5000  // Glow/pulse after command is sent
 const MIN_RECORDING_MS = 1500   // Require at least ~1.5s of recording
 const MIN_VOLUME_THRESHOLD = 12 // Below this max level, treat as silent (0–255)
@@ -263,32 +263,28 @@ export default function VoiceAssistant() {
   }, [])
 
   useEffect(() => {
-    let lastId = null
-
-    async function poll() {
+    // Load the latest commands, then let the backend push new ones as they are saved.
+    async function load() {
       try {
-        const res = await fetch(apiUrl('mood-requests?limit=3'))
+        const res = await fetch(apiUrl(`mood-requests?limit=${RECENT_LIMIT}`))
         if (!res.ok) return
         const data = await res.json()
-        const items = data.requests ?? []
-
-        if (items.length > 0) {
-          const newest = items[0]
-          if (lastId !== null && newest.id !== lastId) {
-            setProcessing(true)
-            setTimeout(() => setProcessing(false), PULSE_DURATION_MS)
-          }
-          lastId = newest.id ?? newest.message
-        }
-        setRequests(items)
+        setRequests(data.requests ?? [])
       } catch (_) {
         // Backend may be offline - don't show error to user
       }
     }
 
-    poll()
-    const id = setInterval(poll, POLL_INTERVAL_MS)
-    return () => clearInterval(id)
+    const source = new EventSource(apiUrl('latest-command/stream'))
+    // Fires on first connect and after every reconnect, so missed commands are picked up
+    source.onopen = load
+    source.onmessage = (event) => {
+      const item = JSON.parse(event.data)
+      setRequests((prev) => [item, ...prev.filter((r) => r.id !== item.id)].slice(0, RECENT_LIMIT))
+      setProcessing(true)
+      setTimeout(() => setProcessing(false), PULSE_DURATION_MS)
+    }
+    return () => source.close()
   }, [])
 
   async function sendToPlay(text) {
@@ -0,0 +1,9 @@
+"""
+Shared test setup. Runs before any test module is imported, so backend.config
+(whose settings are cached on first use) never sees the developer's database.
+"""
+
+import os
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,236 @@
+"""
+Unit tests for IntentEngine's intent cache and in-flight parse coalescing.
+OpenAI is never called: _parse_with_openai is replaced per test, and the
+persisted cache lives in an in-memory SQLite database.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from backend import database
+from backend.intent_engine import IntentEngine
+
+# conftest.py points DATABASE_URL at SQLite in memory, but a .env file loaded with
+# override=True could still win; bind the sessions to a private database explicitly.
+database.engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+database.SessionLocal.configure(bind=database.engine)
+database.init_db()
+
+DRAKE = {"action": "play_music", "query": "Drake", "extras": {}}
+
+
+def _engine(parse) -> IntentEngine:
+    """Engine whose OpenAI call is replaced by `parse`, with an empty in-process cache."""
+    engine = IntentEngine()
+    engine._cache_enabled = True
+    engine._parse_with_openai = parse
+    return engine
+
+
+class _GatedParse:
+    """Fake OpenAI parse that counts calls and blocks until `release` is set."""
+
+    def __init__(self, result=None, error=None):
+        self.calls   = 0
+        self.release = asyncio.Event()
+        self._result = result
+        self._error  = error
+
+    async def __call__(self, user_input):
+        self.calls += 1
+        await self.release.wait()
+        if self._error is not None:
+            raise self._error
+        return dict(self._result)
+
+
+class _FakeCompletions:
+    """Stands in for client.chat.completions, replying with each queued message content in turn."""
+
+    def __init__(self, *contents):
+        self.calls     = 0
+        self._contents = list(contents)
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=self._contents.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _openai_engine(completions: _FakeCompletions) -> IntentEngine:
+    """Engine running the real _parse_with_openai against fake completions."""
+    engine = IntentEngine()
+    engine._cache_enabled = True
+    engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return engine
+
+
+# ── Test 1: concurrent identical prompts share one OpenAI call ───────────────
+def test_concurrent_identical_prompts_share_one_parse():
+    async def run():
+        parse  = _GatedParse(result=DRAKE)
+        engine = _engine(parse)
+        # Normalization folds case and whitespace, so these all share one key
+        tasks = [
+            asyncio.create_task(engine.parse(msg))
+            for msg in ("Play Drake (coalesce)", "play  drake (coalesce)", "PLAY DRAKE (coalesce)")
+        ]
+        await asyncio.sleep(0)
+        parse.release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert parse.calls == 1, f"Expected one OpenAI call, got {parse.calls}"
+        assert all(r["query"] == "Drake" for r in results)
+        assert len({id(r) for r in results}) == len(results), "Callers must get independent copies"
+        assert not engine._inflight, "In-flight entry should be cleared once resolved"
+
+    asyncio.run(run())
+    print("PASS  test_concurrent_identical_prompts_share_one_parse")
+
+
+# ── Test 2: a failed parse reaches every joined caller, then can be retried ──
+def test_failure_propagates_to_all_joined_callers():
+    async def run():
+        parse  = _GatedParse(error=RuntimeError("boom"))
+        engine = _engine(parse)
+        tasks  = [asyncio.create_task(engine.parse("play failing prompt")) for _ in range(3)]
+        await asyncio.sleep(0)
+        parse.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert parse.calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results), results
+        assert not engine._inflight
+
+        # The failure is not cached: the next request parses again
+        retry = await asyncio.gather(engine.parse("play failing prompt"), return_exceptions=True)
+        assert isinstance(retry[0], RuntimeError)
+        assert parse.calls == 2
+
+    asyncio.run(run())
+    print("PASS  test_failure_propagates_to_all_joined_callers")
+
+
+# ── Test 3: cancelling the request that started a parse spares the joiners ──
+def test_cancelling_originator_does_not_cancel_joiners():
+    async def run():
+        parse  = _GatedParse(result=DRAKE)
+        engine = _engine(parse)
+        owner  = asyncio.create_task(engine.parse("play drake (cancel owner)"))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(engine.parse("play drake (cancel owner)"))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        await asyncio.sleep(0)
+        parse.release.set()
+        result = await joiner
+
+        assert owner.cancelled(), "The cancelled request itself should end cancelled"
+        assert result["query"] == "Drake"
+        assert parse.calls == 1
+
+    asyncio.run(run())
+    print("PASS  test_cancelling_originator_does_not_cancel_joiners")
+
+
+# ── Test 4: a cancelled joiner leaves the originator's parse running ─────────
+def test_cancelling_joiner_does_not_cancel_originator():
+    async def run():
+        parse  = _GatedParse(result=DRAKE)
+        engine = _engine(parse)
+        owner  = asyncio.create_task(engine.parse("play drake (cancel joiner)"))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(engine.parse("play drake (cancel joiner)"))
+        await asyncio.sleep(0)
+
+        joiner.cancel()
+        await asyncio.sleep(0)
+        parse.release.set()
+
+        assert (await owner)["query"] == "Drake"
+        assert joiner.cancelled()
+
+    asyncio.run(run())
+    print("PASS  test_cancelling_joiner_does_not_cancel_originator")
+
+
+# ── Test 5: repeats are served from the in-process, then persisted, cache ────
+def test_repeat_prompt_served_from_cache():
+    async def run():
+        parse  = _GatedParse(result=DRAKE)
+        parse.release.set()
+        engine = _engine(parse)
+
+        first = await engine.parse("play drake (cached)")
+        assert first["source"] == "openai"
+
+        # Mutating a returned intent must not leak into the cache
+        first["query"] = "changed"
+        second = await engine.parse("Play Drake (cached)")
+        assert second["source"] == "cache"
+        assert second["query"] == "Drake"
+
+        # A fresh engine has an empty LRU but finds the persisted entry
+        third = await _engine(parse).parse("play drake (cached)")
+        assert third["source"] == "cache"
+        assert parse.calls == 1, f"Expected one OpenAI call, got {parse.calls}"
+
+    asyncio.run(run())
+    print("PASS  test_repeat_prompt_served_from_cache")
+
+
+# ── Test 6: a failed OpenAI parse is not persisted ───────────────────────────
+def test_failed_parse_not_persisted():
+    async def run():
+        # First completion comes back empty (parsed as "unknown"), the second succeeds
+        completions = _FakeCompletions("", json.dumps(DRAKE))
+
+        first = await _openai_engine(completions).parse("play drake (transient failure)")
+        assert first["action"] == "unknown"
+
+        # A fresh engine only sees the persisted cache, which must not hold the failure
+        second = await _openai_engine(completions).parse("play drake (transient failure)")
+        assert second["source"] == "openai", f"Expected a new OpenAI parse, got {second['source']!r}"
+        assert second["query"] == "Drake"
+        assert completions.calls == 2
+
+    asyncio.run(run())
+    print("PASS  test_failed_parse_not_persisted")
+
+
+# ── Test 7: a failed OpenAI parse is not kept in the in-process cache ────────
+def test_failed_parse_not_remembered():
+    async def run():
+        completions = _FakeCompletions("{not json", json.dumps(DRAKE))
+        engine = _openai_engine(completions)
+
+        first = await engine.parse("play drake (malformed reply)")
+        assert first["action"] == "unknown"
+
+        # Same engine: the retry must reach OpenAI rather than the LRU
+        second = await engine.parse("play drake (malformed reply)")
+        assert second["source"] == "openai", f"Expected a new OpenAI parse, got {second['source']!r}"
+        assert second["query"] == "Drake"
+        assert completions.calls == 2
+
+    asyncio.run(run())
+    print("PASS  test_failed_parse_not_remembered")
+
+
+# ── Run all tests ─────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    test_concurrent_identical_prompts_share_one_parse()
+    test_failure_propagates_to_all_joined_callers()
+    test_cancelling_originator_does_not_cancel_joiners()
+    test_cancelling_joiner_does_not_cancel_originator()
+    test_repeat_prompt_served_from_cache()
+    test_failed_parse_not_persisted()
+    test_failed_parse_not_remembered()
+    print("\nAll tests passed.")
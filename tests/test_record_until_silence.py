@@ -3,6 +3,7 @@ Unit tests for record_until_silence() using synthetic PCM data.
 No real microphone or audio hardware is required.
 """
 
+import itertools
 import os
 import sys
 import tempfile
@@ -12,6 +13,10 @@ import wave
 import numpy as np
 
 # ── Stubs so voice_client imports cleanly without real hardware ───────────────
+# Only installed while voice_client is imported (see below): other test files in the
+# same session must still see the real packages.
+_STUBBED = ("pyaudio", "openai", "pynput", "pynput.keyboard", "requests", "backend", "backend.config")
+_saved_modules = {name: sys.modules.get(name) for name in _STUBBED}
 
 # pyaudio stub
 pa_mod = types.ModuleType("pyaudio")
@@ -80,7 +85,15 @@ sys.modules["pynput"] = pynput_mod
 sys.modules["pynput.keyboard"] = kb_mod
 
 # requests stub
-sys.modules["requests"] = types.ModuleType("requests")
+requests_mod = types.ModuleType("requests")
+
+
+class _FakeSession:
+    pass
+
+
+requests_mod.Session = _FakeSession   # satisfies type annotations in voice_client
+sys.modules["requests"] = requests_mod
 
 # backend.config stub
 cfg_pkg = types.ModuleType("backend")
@@ -90,7 +103,16 @@ sys.modules["backend"] = cfg_pkg
 sys.modules["backend.config"] = cfg_mod
 
 # ── Now import the module under test ─────────────────────────────────────────
-from voice_client import CHUNK, SAMPLE_RATE, record_until_silence  # noqa: E402
+from voice_client import (  # noqa: E402
+    CHUNK, SAMPLE_RATE, SPEECH_ENTER, SPEECH_EXIT, record_until_silence,
+)
+
+# voice_client keeps its references to the stubs; put the real modules back for everyone else
+for _name, _module in _saved_modules.items():
+    if _module is None:
+        sys.modules.pop(_name, None)
+    else:
+        sys.modules[_name] = _module
 
 THRESHOLD = 500.0
 
@@ -102,8 +124,15 @@ def _make_chunk(amplitude: int) -> bytes:
     return samples.tobytes()
 
 
-SILENCE_CHUNK = _make_chunk(100)   # RMS ≈ 71  — below threshold
-SPEECH_CHUNK  = _make_chunk(1000)  # RMS ≈ 707 — above threshold
+# Hysteresis: speech starts above THRESHOLD × SPEECH_ENTER (700) and only counts as
+# silence again below THRESHOLD × SPEECH_EXIT (400)
+SILENCE_CHUNK = _make_chunk(100)   # RMS ≈ 71   — below the exit limit
+QUIET_CHUNK   = _make_chunk(500)   # RMS ≈ 354  — just below the exit limit
+HOLD_CHUNK    = _make_chunk(640)   # RMS ≈ 452  — below threshold, but above the exit limit
+NEAR_CHUNK    = _make_chunk(850)   # RMS ≈ 601  — above threshold, but below the enter limit
+SPEECH_CHUNK  = _make_chunk(2000)  # RMS ≈ 1414 — well above the enter limit
+
+assert 354 < THRESHOLD * SPEECH_EXIT < 452 < THRESHOLD < 601 < THRESHOLD * SPEECH_ENTER
 
 
 # ── Test 1: normal speech-then-silence flow ───────────────────────────────────
@@ -142,7 +171,8 @@ def test_all_silence_returns_empty_string():
     original_max = voice_client.MAX_RECORD_SECS
     voice_client.MAX_RECORD_SECS = 0.1  # very short cap so the loop exits fast
 
-    _FakePyAudio._stream = _FakeStream([SILENCE_CHUNK] * 10_000)
+    # endless silence, streamed rather than materialized as a list
+    _FakePyAudio._stream = _FakeStream(itertools.repeat(SILENCE_CHUNK))
 
     tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
     tmp.close()
@@ -201,9 +231,85 @@ def test_preroll_included():
             os.unlink(tmp.name)
 
 
+def _record_frames(chunks) -> int:
+    """Run record_until_silence over `chunks`; return the number of frames written (0 if none)."""
+    _FakePyAudio._stream = _FakeStream(chunks)
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    tmp.close()
+
+    try:
+        result = record_until_silence(
+            output=tmp.name, threshold=THRESHOLD, silence_duration=1.5
+        )
+        if not result:
+            return 0
+        with wave.open(result, "rb") as wf:
+            return wf.getnframes()
+    finally:
+        if os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+
+
+# ── Test 4: onset needs more than threshold × SPEECH_ENTER ────────────────────
+def test_onset_requires_enter_limit():
+    import voice_client
+    original_max = voice_client.MAX_RECORD_SECS
+    voice_client.MAX_RECORD_SECS = 0.5
+
+    try:
+        # Above the caller's threshold but below the enter limit: never starts
+        frames = _record_frames(itertools.repeat(NEAR_CHUNK))
+        assert frames == 0, f"Expected no recording, got {frames} frames"
+        print("PASS  test_onset_requires_enter_limit")
+    finally:
+        voice_client.MAX_RECORD_SECS = original_max
+
+
+# ── Test 5: chunks between the exit and enter limits keep recording ───────────
+def test_hold_chunks_keep_recording():
+    import voice_client
+    silence_limit = int(SAMPLE_RATE / CHUNK * 1.5)   # 46 chunks
+    hold_count    = silence_limit + 20               # would stop early if counted as silence
+
+    chunks = (
+        [SILENCE_CHUNK] * voice_client.PREROLL_CHUNKS
+        + [SPEECH_CHUNK] * 10
+        + [HOLD_CHUNK] * hold_count
+        + [SILENCE_CHUNK] * 60
+    )
+    frames = _record_frames(chunks)
+
+    expected = (voice_client.PREROLL_CHUNKS + 9 + hold_count + silence_limit) * CHUNK
+    assert frames == expected, f"Expected {expected} frames, got {frames}"
+    print("PASS  test_hold_chunks_keep_recording")
+
+
+# ── Test 6: recording stops once chunks fall below threshold × SPEECH_EXIT ────
+def test_stops_below_exit_limit():
+    import voice_client
+    silence_limit = int(SAMPLE_RATE / CHUNK * 1.5)   # 46 chunks
+
+    chunks = (
+        [SILENCE_CHUNK] * voice_client.PREROLL_CHUNKS
+        + [SPEECH_CHUNK] * 10
+        + [QUIET_CHUNK] * 60
+    )
+    frames = _record_frames(chunks)
+
+    # Pre-roll (ending with the onset chunk), the other 9 speech chunks, then exactly
+    # silence_limit quiet chunks before the stop
+    expected = (voice_client.PREROLL_CHUNKS + 9 + silence_limit) * CHUNK
+    assert frames == expected, f"Expected {expected} frames, got {frames}"
+    print("PASS  test_stops_below_exit_limit")
+
+
 # ── Run all tests ─────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     test_speech_detected_and_file_written()
     test_all_silence_returns_empty_string()
     test_preroll_included()
+    test_onset_requires_enter_limit()
+    test_hold_chunks_keep_recording()
+    test_stops_below_exit_limit()
     print("\nAll tests passed.")
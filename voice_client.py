@@ -1,9 +1,10 @@
+import io
 import math
+import queue
 import struct
 import sys
 import threading
-import wave
-from collections import deque
+from typing import BinaryIO
 
 import numpy as np
 import pyaudio
@@ -31,33 +32,167 @@ CALIBRATE_SECS   = 1.0     # Seconds to sample ambient noise on startup
 SILENCE_MARGIN   = 1.8     # Multiplier over ambient RMS to count as speech
 PREROLL_CHUNKS   = 8       # Chunks to keep before speech starts (avoids cutting off first word)
 MAX_RECORD_SECS  = 30      # Hard cap — stops if you never go quiet
+SPEECH_ENTER     = 1.4     # Hysteresis: speech starts above threshold × this...
+SPEECH_EXIT      = 0.8     # ...and only counts as silence again below threshold × this
 
+SAMPLE_WIDTH     = 2       # bytes per paInt16 sample
+CHUNKS_PER_SEC   = SAMPLE_RATE / CHUNK
+# Pre-roll ring index wraps with a mask, so PREROLL_CHUNKS must stay a power of two
+PREROLL_MASK     = PREROLL_CHUNKS - 1
+assert PREROLL_CHUNKS & PREROLL_MASK == 0, "PREROLL_CHUNKS must be a power of two"
 
-def _rms(chunk: bytes) -> float:
-    """Root-mean-square amplitude of a raw PCM chunk."""
-    count = len(chunk) // 2
-    if count == 0:
-        return 0.0
-    shorts = struct.unpack(f"{count}h", chunk)
-    return math.sqrt(sum(s * s for s in shorts) / count)
+
+def _rms(pcm: bytes) -> np.ndarray:
+    """Root-mean-square amplitude of each CHUNK-sized chunk in a run of raw PCM."""
+    # Row-wise sum of squares straight off the int16 view, accumulated in int64 (no float temporaries)
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, CHUNK)
+    return np.sqrt(np.einsum("ij,ij->i", samples, samples, dtype=np.int64) / CHUNK)
 
 
 def _calibrate(stream: pyaudio.Stream) -> float:
     """Measure ambient noise level so the threshold adapts to the environment."""
     print("Calibrating ambient noise... (stay quiet)")
-    chunks = int(SAMPLE_RATE / CHUNK * CALIBRATE_SECS)
-    levels = [_rms(stream.read(CHUNK)) for _ in range(chunks)]
-    ambient = sum(levels) / len(levels)
+    chunks = int(CHUNKS_PER_SEC * CALIBRATE_SECS)
+    ambient = float(_rms(b"".join(stream.read(CHUNK) for _ in range(chunks))).mean())
     threshold = max(ambient * SILENCE_MARGIN, 80)   # 80 = absolute floor
     print(f"Threshold set to {threshold:.0f} RMS  (ambient: {ambient:.0f})\n")
     return threshold
 
 
-def record(output: str = OUTPUT_FILE) -> str:
+# Canonical 44-byte PCM WAV header: RIFF chunk, 16-byte fmt chunk, data chunk header
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+class _WavWriter:
+    """
+    Minimal WAV writer specialised for the capture format (mono, 16-bit, SAMPLE_RATE).
+    Writes a placeholder header up front, appends raw PCM, and patches the sizes on close.
+    """
+
+    def __init__(self, output: str | BinaryIO):
+        self._owned = isinstance(output, str)
+        self._file: BinaryIO = open(output, "wb") if self._owned else output
+        self._start = self._file.tell()
+        self._size = 0
+        self._file.write(self._header())
+
+    def _header(self) -> bytes:
+        block_align = CHANNELS * SAMPLE_WIDTH
+        return _WAV_HEADER.pack(
+            b"RIFF", 36 + self._size, b"WAVE",
+            b"fmt ", 16, 1, CHANNELS, SAMPLE_RATE, SAMPLE_RATE * block_align, block_align, SAMPLE_WIDTH * 8,
+            b"data", self._size,
+        )
+
+    def writeframesraw(self, data) -> None:
+        self._size += self._file.write(data)
+
+    def close(self) -> None:
+        end = self._file.tell()
+        self._file.seek(self._start)
+        self._file.write(self._header())
+        self._file.seek(end)
+        if self._owned:
+            self._file.close()
+
+
+def _read_chunks(stream: pyaudio.Stream, stop: threading.Event, out: queue.SimpleQueue) -> None:
+    """Producer thread: keep draining PortAudio so a slow consumer can't overflow its buffer."""
+    try:
+        while not stop.is_set():
+            out.put(stream.read(CHUNK, exception_on_overflow=False))
+    except Exception as exc:   # hand device errors to the consumer
+        out.put(exc)
+
+
+def _print_status(messages: queue.SimpleQueue) -> None:
+    """Status thread: console writes can be slow (notably on Windows), so keep them off the capture loop."""
+    while (message := messages.get()) is not None:
+        print(message, end="\r", flush=True)
+
+
+def _capture(
+    stream: pyaudio.Stream,
+    threshold: float,
+    silence_duration: float,
+    output: str | BinaryIO,
+) -> bool:
+    """
+    Read chunks until speech is followed by `silence_duration` seconds of silence,
+    streaming the speech (pre-roll included) to `output` as WAV. Returns False, and
+    creates nothing, if nobody spoke before MAX_RECORD_SECS.
+    """
+    silence_limit = int(CHUNKS_PER_SEC * silence_duration)
+    max_chunks    = int(CHUNKS_PER_SEC * MAX_RECORD_SECS)
+    # Ring of the last PREROLL_CHUNKS chunks before speech; slot `head` is overwritten next
+    preroll       = np.empty((PREROLL_CHUNKS, CHUNK), dtype=np.int16)
+    head          = 0
+    scratch       = np.empty(CHUNK, dtype=np.float64)   # reused for every chunk's sum of squares
+    # rms > t  <=>  sum of squares > t² · CHUNK. The sum of squares of int16 samples is a
+    # whole number, so flooring the limits to ints once keeps every per-chunk test exact
+    enter_limit   = math.floor((threshold * SPEECH_ENTER) ** 2 * CHUNK)
+    exit_limit    = math.floor((threshold * SPEECH_EXIT) ** 2 * CHUNK)
+    wf            = None   # opened at speech onset; chunks go straight to it from then on
+    silent_chunks = 0
+    total_chunks  = 0
+
+    # Reading and console output run on their own threads; this loop only does RMS, state and file writes
+    chunks = queue.SimpleQueue()
+    stop   = threading.Event()
+    reader = threading.Thread(target=_read_chunks, args=(stream, stop, chunks), daemon=True)
+    reader.start()
+    status = queue.SimpleQueue()
+    status_thread = threading.Thread(target=_print_status, args=(status,), daemon=True)
+    status_thread.start()
+
+    try:
+        while total_chunks < max_chunks:
+            chunk = chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            samples = np.frombuffer(chunk, dtype=np.int16)   # zero-copy view, shared below
+            work    = scratch[:samples.size]
+            np.copyto(work, samples)
+            energy  = work.dot(work)
+            total_chunks += 1
+
+            if wf is None:
+                preroll[head] = samples
+                head = (head + 1) & PREROLL_MASK
+                if energy > enter_limit:
+                    wf = _WavWriter(output)
+                    # include the pre-roll, oldest first, so the first word isn't clipped
+                    if total_chunks >= PREROLL_CHUNKS:
+                        wf.writeframesraw(np.roll(preroll, -head, axis=0))
+                    else:
+                        wf.writeframesraw(preroll[:head])
+                    status.put("Recording...    ")
+            else:
+                # writeframesraw skips the per-call header rewrite; close() patches it once
+                wf.writeframesraw(chunk)
+                if energy <= exit_limit:
+                    silent_chunks += 1
+                    if silent_chunks >= silence_limit:
+                        break
+                else:
+                    silent_chunks = 0
+    finally:
+        stop.set()
+        reader.join()   # at most one more read; the stream is closed after we return
+        status.put(None)
+        status_thread.join()   # flush any status line before the caller prints "Done."
+        if wf is not None:
+            wf.close()
+
+    return wf is not None
+
+
+def record(output: str | BinaryIO = OUTPUT_FILE) -> str | BinaryIO:
     """
     Record from the microphone using silence detection.
     - Waits until speech is detected above the noise threshold.
     - Stops automatically after SILENCE_DURATION seconds of silence.
+    - `output` may be a path or a binary buffer (e.g. io.BytesIO) to keep the WAV in memory.
     """
     audio = pyaudio.PyAudio()
     stream = audio.open(
@@ -71,50 +206,16 @@ def record(output: str = OUTPUT_FILE) -> str:
     threshold = _calibrate(stream)
 
     print("Listening... (speak when ready)")
-    preroll   = deque(maxlen=PREROLL_CHUNKS)   # circular buffer before speech
-    frames    = []
-    speaking  = False
-    silent_chunks = 0
-    silence_limit = int(SAMPLE_RATE / CHUNK * SILENCE_DURATION)
-    max_chunks    = int(SAMPLE_RATE / CHUNK * MAX_RECORD_SECS)
-    total_chunks  = 0
-
-    while total_chunks < max_chunks:
-        chunk = stream.read(CHUNK, exception_on_overflow=False)
-        level = _rms(chunk)
-        total_chunks += 1
-
-        if not speaking:
-            preroll.append(chunk)
-            if level > threshold:
-                speaking = True
-                frames.extend(preroll)   # include the pre-roll so the word isn't clipped
-                print("Recording...    ", end="\r")
-        else:
-            frames.append(chunk)
-            if level <= threshold:
-                silent_chunks += 1
-                if silent_chunks >= silence_limit:
-                    break
-            else:
-                silent_chunks = 0
+    spoke = _capture(stream, threshold, SILENCE_DURATION, output)
 
     stream.stop_stream()
     stream.close()
+    audio.terminate()
 
-    if not speaking:
-        audio.terminate()
+    if not spoke:
         return ""
 
     print("Done.           ")
-
-    with wave.open(output, "wb") as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(audio.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(b"".join(frames))
-
-    audio.terminate()
     return output
 
 
@@ -126,9 +227,9 @@ def record_until_silence(
     """
     Record from the microphone using numpy-based RMS volume detection.
 
-    - Waits until a chunk's RMS volume exceeds `threshold` (speech onset).
-    - Stops and saves the file once volume stays below `threshold` for
-      `silence_duration` continuous seconds.
+    - Waits until a chunk's RMS volume exceeds `threshold` × SPEECH_ENTER (speech onset).
+    - Stops and saves the file once volume stays below `threshold` × SPEECH_EXIT
+      for `silence_duration` continuous seconds.
     - Returns the path to the saved .wav file, or an empty string if no
       speech was detected before the hard cap (MAX_RECORD_SECS).
     """
@@ -141,69 +242,59 @@ def record_until_silence(
         frames_per_buffer=CHUNK,
     )
 
-    silence_limit  = int(SAMPLE_RATE / CHUNK * silence_duration)
-    max_chunks     = int(SAMPLE_RATE / CHUNK * MAX_RECORD_SECS)
-    preroll        = deque(maxlen=PREROLL_CHUNKS)
-    frames         = []
-    speaking       = False
-    silent_chunks  = 0
-    total_chunks   = 0
-
     print("Listening... (speak when ready)")
-
-    while total_chunks < max_chunks:
-        raw   = stream.read(CHUNK, exception_on_overflow=False)
-        total_chunks += 1
-
-        # numpy RMS: interpret raw bytes as signed 16-bit PCM samples
-        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
-        rms     = float(np.sqrt(np.mean(samples ** 2))) if samples.size else 0.0
-
-        if not speaking:
-            preroll.append(raw)
-            if rms > threshold:
-                speaking = True
-                frames.extend(preroll)
-                print("Recording...    ", end="\r")
-        else:
-            frames.append(raw)
-            if rms <= threshold:
-                silent_chunks += 1
-                if silent_chunks >= silence_limit:
-                    break
-            else:
-                silent_chunks = 0
+    spoke = _capture(stream, threshold, silence_duration, output)
 
     stream.stop_stream()
     stream.close()
+    audio.terminate()
 
-    if not speaking:
-        audio.terminate()
+    if not spoke:
         return ""
 
     print("Done.           ")
+    return output
 
-    with wave.open(output, "wb") as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(audio.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(b"".join(frames))
 
-    audio.terminate()
-    return output
+_openai_client: OpenAI | None = None
+
+
+def _get_openai() -> OpenAI:
+    """OpenAI client shared across transcriptions, created on first use."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
 
 
-def transcribe_audio(file_path: str) -> str:
-    """Transcribe a WAV file to text using OpenAI's whisper-1 model."""
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    with open(file_path, "rb") as f:
-        result = client.audio.transcriptions.create(model="whisper-1", file=f)
+def transcribe_audio(audio: str | BinaryIO) -> str:
+    """Transcribe a WAV file path or in-memory WAV buffer using OpenAI's whisper-1 model."""
+    client = _get_openai()
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            result = client.audio.transcriptions.create(model="whisper-1", file=f)
+    else:
+        audio.seek(0)
+        result = client.audio.transcriptions.create(
+            model="whisper-1", file=(OUTPUT_FILE, audio, "audio/wav")
+        )
     return result.text
 
 
+_session: requests.Session | None = None
+
+
+def _get_session() -> requests.Session:
+    """Keep-alive session to the backend, created on first use."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
 def send_to_assistant(text: str) -> dict:
     """POST the transcribed text to the FastAPI /play endpoint."""
-    response = requests.post(BACKEND_URL, json={"message": text}, timeout=30)
+    response = _get_session().post(BACKEND_URL, json={"message": text}, timeout=30)
     response.raise_for_status()
     return response.json()
 
@@ -250,22 +341,26 @@ _hotkey_listener = keyboard.GlobalHotKeys({"<ctrl>+<shift>+l": _on_hotkey})
 _hotkey_listener.start()
 
 
-def _wait_for_trigger():
-    """Block until user presses Enter or Ctrl+Shift+L."""
-    _trigger_record.clear()
+_stdin_reader: threading.Thread | None = None
 
-    def wait_enter():
-        try:
-            input()
-        except EOFError:
-            pass
+
+def _read_stdin():
+    """Persistent reader: every Enter press triggers a recording."""
+    for _ in sys.stdin:
         _trigger_record.set()
+    # stdin closed (EOF) — only the hotkey can trigger from here on
+
 
-    t = threading.Thread(target=wait_enter, daemon=True)
-    t.start()
+def _wait_for_trigger():
+    """Block until user presses Enter or Ctrl+Shift+L."""
+    global _stdin_reader
+    _trigger_record.clear()
+    # One long-lived reader instead of a fresh input() thread per session; those were
+    # left blocked whenever the hotkey fired first, and then all woke on the next Enter
+    if _stdin_reader is None:
+        _stdin_reader = threading.Thread(target=_read_stdin, daemon=True)
+        _stdin_reader.start()
     _trigger_record.wait()
-    if t.is_alive():
-        t.join(timeout=0.1)
 
 
 if __name__ == "__main__":
@@ -276,7 +371,8 @@ if __name__ == "__main__":
     while True:
         try:
             _wait_for_trigger()
-            wav = record()
+            # Keep the WAV in memory; it goes straight from the mic to the upload
+            wav = record(io.BytesIO())
 
             if not wav:
                 print("No speech detected — try again.\n")